@@ -1,2 +1,6 @@
 # Number of requests per second
-RATE_THRESHOLD = 10
\ No newline at end of file
+RATE_THRESHOLD = 10
+
+# Sub bucket counts of the sliding window counter ratelimiters exposed by
+# the dummy app for comparing accuracy against # of sub buckets.
+SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS = [2, 5, 10]
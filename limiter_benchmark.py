@@ -0,0 +1,190 @@
+import sys
+from constants import RATE_THRESHOLD
+from ratelimiter.limiter import ALGORITHMS, Limiter
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
+
+# Duration of each benchmark run in seconds.
+BENCHMARK_DURATION = 10
+
+# Max # of seconds each acquire() call waits for a token.
+ACQUIRE_TIMEOUT = 1
+
+# Benchmark modes.
+THREAD = 'thread'
+ASYNCIO = 'asyncio'
+
+MODES = [THREAD, ASYNCIO]
+
+USAGE = ('usage: python3 limiter_benchmark.py [%s] [%s] [workers] [rate]' %
+         ('|'.join(MODES), '|'.join(ALGORITHMS)))
+
+
+class AcquireStats(object):
+    ''' A class to collect acquire() results of one benchmark worker.
+
+    Attributes
+    ----------
+    acquired_count : int
+        # of successful acquire() calls
+    timeout_count : int
+        # of acquire() calls which timed out
+    total_wait : float
+        total time spent in acquire() in seconds
+    '''
+
+    def __init__(self):
+        self.acquired_count = 0
+        self.timeout_count = 0
+        self.total_wait = 0
+        super().__init__()
+
+    def log_acquire(self, acquired, wait):
+        '''Count an acquire() call
+
+        Parameters
+        ----------
+        acquired : bool
+            True if acquire() got a token
+        wait : float
+            time spent in acquire() in seconds
+        '''
+        if acquired:
+            self.acquired_count += 1
+        else:
+            self.timeout_count += 1
+        self.total_wait += wait
+
+
+def print_result(mode, limiter_name, worker_count, rate, stats, total_time):
+    '''Print aggregated stats of all workers.
+
+    Parameters
+    ----------
+    mode : str
+        thread or asyncio
+    limiter_name : str
+        name of the ratelimiter algorithm
+    worker_count : int
+        # of concurrent callers
+    rate : int
+        limiter rate threshold per second
+    stats : List
+        AcquireStats of every worker
+    total_time : float
+        benchmark duration in seconds
+    '''
+    acquired = sum(s.acquired_count for s in stats)
+    timeouts = sum(s.timeout_count for s in stats)
+    total_wait = sum(s.total_wait for s in stats)
+    calls = acquired + timeouts
+    print('mode: %s; limiter: %s; workers: %d; rate threshold: %d; '
+          'acquired rate: %.4f; timeouts: %d; mean acquire wait: %.4fms' %
+          (mode, limiter_name, worker_count, rate, acquired / total_time,
+           timeouts, 1000 * total_wait / calls if calls else 0))
+
+
+def thread_worker(limiter, end_time):
+    '''Call limiter.acquire() in a loop until end_time.
+
+    Returns
+    -------
+    AcquireStats
+        the worker's stats
+    '''
+    stats = AcquireStats()
+    while time.time() < end_time:
+        start_time = time.time()
+        acquired = limiter.acquire(ACQUIRE_TIMEOUT)
+        stats.log_acquire(acquired, time.time() - start_time)
+    return stats
+
+
+async def async_worker(limiter, end_time):
+    '''Call limiter.acquire_async() in a loop until end_time.
+
+    Returns
+    -------
+    AcquireStats
+        the worker's stats
+    '''
+    stats = AcquireStats()
+    while time.time() < end_time:
+        start_time = time.time()
+        acquired = await limiter.acquire_async(ACQUIRE_TIMEOUT)
+        stats.log_acquire(acquired, time.time() - start_time)
+    return stats
+
+
+def benchmark_thread(limiter, worker_count):
+    '''Benchmark acquire() throughput with a thread pool.
+
+    Returns
+    -------
+    List
+        AcquireStats of every worker
+    '''
+    end_time = time.time() + BENCHMARK_DURATION
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        futures = [executor.submit(thread_worker, limiter, end_time)
+                   for _ in range(worker_count)]
+        return [future.result() for future in futures]
+
+
+def benchmark_asyncio(limiter, worker_count):
+    '''Benchmark acquire_async() throughput with asyncio tasks.
+
+    Returns
+    -------
+    List
+        AcquireStats of every worker
+    '''
+    end_time = time.time() + BENCHMARK_DURATION
+
+    async def run():
+        return await asyncio.gather(
+            *[async_worker(limiter, end_time) for _ in range(worker_count)])
+
+    return asyncio.run(run())
+
+
+def benchmark(mode, limiter_name, worker_count, rate):
+    '''Benchmark a ratelimiter's acquire throughput.
+
+    Each benchmark uses its own redis key so that leftover data from
+    a previous run won't affect it.
+
+    Parameters
+    ----------
+    mode : str
+        thread or asyncio
+    limiter_name : str
+        name of the ratelimiter algorithm
+    worker_count : int
+        # of concurrent callers
+    rate : int
+        limiter rate threshold per second
+    '''
+    if mode not in MODES:
+        raise ValueError('unknown benchmark mode: %s' % mode)
+    limiter = Limiter(
+        limiter_name, "benchmark_%s_%d" % (limiter_name, time.time()),
+        rate, 1)
+    start_time = time.time()
+    if mode == THREAD:
+        stats = benchmark_thread(limiter, worker_count)
+    else:
+        stats = benchmark_asyncio(limiter, worker_count)
+    print_result(mode, limiter_name, worker_count, rate, stats,
+                 time.time() - start_time)
+
+
+if __name__ == '__main__':
+    if (len(sys.argv) < 3 or sys.argv[1] not in MODES
+            or sys.argv[2] not in ALGORITHMS):
+        sys.exit(USAGE)
+    benchmark(sys.argv[1],
+              sys.argv[2],
+              int(sys.argv[3]) if len(sys.argv) > 3 else 8,
+              int(sys.argv[4]) if len(sys.argv) > 4 else RATE_THRESHOLD)
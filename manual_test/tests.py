@@ -1,3 +1,245 @@
-from django.test import TestCase
+from decouple import config
+from django.test import SimpleTestCase
+from ratelimiter.limiter import (
+    Limiter,
+    ALGORITHMS,
+    SLIDING_WINDOW_LOG,
+    SLIDING_WINDOW_PRORATE,
+    SLIDING_WINDOW_COUNTER,
+    redis_client)
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+import asyncio
+import random
+import redis
+import time
+import uuid
 
-# Create your tests here.
+# Max # of seconds a timed out acquire may return after its timeout.
+TIMEOUT_TOLERANCE = 0.1
+
+# Max # of seconds to wait for the redis server when checking if it is
+# available.
+REDIS_PROBE_TIMEOUT = 1
+
+
+class StubRedisClient(object):
+    '''A redis client stub which records lua script calls instead of
+    sending them to a redis server.
+
+    Attributes
+    ----------
+    calls : List
+        (keys, args) of each script call
+    result : int
+        result returned by every script call
+    '''
+
+    def __init__(self, result=1):
+        self.calls = []
+        self.result = result
+        super().__init__()
+
+    def evalsha(self, sha, numkeys, *keys_and_args):
+        self.calls.append(
+            (list(keys_and_args[:numkeys]), list(keys_and_args[numkeys:])))
+        return self.result
+
+
+def is_redis_available():
+    '''Check if the redis server configured by REDIS_HOST is reachable.'''
+    probe_client = redis.Redis(
+        host=config('REDIS_HOST'),
+        port=config('REDIS_PORT', cast=int),
+        socket_connect_timeout=REDIS_PROBE_TIMEOUT,
+        socket_timeout=REDIS_PROBE_TIMEOUT)
+    try:
+        return probe_client.ping()
+    except (redis.ConnectionError, redis.TimeoutError):
+        return False
+
+
+def create_limiter(algorithm=SLIDING_WINDOW_LOG, rate=100, window=1,
+                   **kwargs):
+    '''Create a limiter on a StubRedisClient. The default rate and window
+    make acquire() retry every 10ms.'''
+    return Limiter(algorithm, 'test', rate, window,
+                   client=StubRedisClient(), **kwargs)
+
+
+class LimiterInitTest(SimpleTestCase):
+    def test_unknown_algorithm(self):
+        with self.assertRaises(ValueError):
+            Limiter('unknown', 'test', 10, 1, client=StubRedisClient())
+
+    def test_non_positive_rate(self):
+        for rate in [0, -1]:
+            with self.assertRaises(ValueError):
+                create_limiter(rate=rate)
+
+    def test_non_positive_window(self):
+        for window in [0, -1]:
+            with self.assertRaises(ValueError):
+                create_limiter(window=window)
+
+    def test_non_positive_sub_bucket_count(self):
+        with self.assertRaises(ValueError):
+            create_limiter(SLIDING_WINDOW_COUNTER, sub_bucket_count=0)
+
+    def test_all_algorithms(self):
+        for algorithm in ALGORITHMS:
+            create_limiter(algorithm)
+
+
+class LimiterAcquireTest(SimpleTestCase):
+    def test_zero_timeout_tries_once(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire',
+                               return_value=False) as try_acquire:
+            self.assertFalse(limiter.acquire(timeout=0))
+        self.assertEqual(try_acquire.call_count, 1)
+
+    def test_timeout(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire', return_value=False):
+            start_time = time.monotonic()
+            self.assertFalse(limiter.acquire(timeout=0.2))
+            elapsed = time.monotonic() - start_time
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 0.2 + TIMEOUT_TOLERANCE)
+
+    def test_acquire_once_token_frees_up(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire',
+                               side_effect=[False, False, True]) as try_acquire:
+            self.assertTrue(limiter.acquire(timeout=1))
+        self.assertEqual(try_acquire.call_count, 3)
+
+    def test_acquire_without_timeout(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire',
+                               side_effect=[False, True]):
+            self.assertTrue(limiter.acquire())
+
+    def test_acquire_uses_client(self):
+        limiter = create_limiter()
+        self.assertTrue(limiter.acquire(timeout=0))
+        self.assertEqual(len(limiter._redis_client.calls), 1)
+
+
+class LimiterAcquireAsyncTest(SimpleTestCase):
+    def test_zero_timeout_tries_once(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire',
+                               return_value=False) as try_acquire:
+            self.assertFalse(asyncio.run(limiter.acquire_async(timeout=0)))
+        self.assertEqual(try_acquire.call_count, 1)
+
+    def test_timeout(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire', return_value=False):
+            start_time = time.monotonic()
+            self.assertFalse(asyncio.run(limiter.acquire_async(timeout=0.2)))
+            elapsed = time.monotonic() - start_time
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 0.2 + TIMEOUT_TOLERANCE)
+
+    def test_acquire_once_token_frees_up(self):
+        limiter = create_limiter()
+        with mock.patch.object(limiter, 'try_acquire',
+                               side_effect=[False, False, True]) as try_acquire:
+            self.assertTrue(asyncio.run(limiter.acquire_async(timeout=1)))
+        self.assertEqual(try_acquire.call_count, 3)
+
+    def test_acquire_in_executor(self):
+        limiter = create_limiter()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            self.assertTrue(asyncio.run(
+                limiter.acquire_async(timeout=0, executor=executor)))
+        self.assertEqual(len(limiter._redis_client.calls), 1)
+
+
+@mock.patch('ratelimiter.limiter.time')
+class SlidingWindowCounterArgsTest(SimpleTestCase):
+    def test_bucket_index_and_portion(self, mock_time):
+        mock_time.time.return_value = 1000.375
+        limiter = create_limiter(
+            SLIDING_WINDOW_COUNTER, rate=10, sub_bucket_count=4)
+        limiter.try_acquire()
+        keys, args = limiter._redis_client.calls[0]
+        self.assertEqual(keys, ['test'])
+        # 1000.375s is half way through sub bucket 4001 of 0.25s, so half
+        # of the oldest sub bucket 3997 is inside the sliding window.
+        self.assertEqual(args, [4001, 4, 0.5, 10, 2000])
+
+    def test_one_sub_bucket_matches_prorate(self, mock_time):
+        mock_time.time.return_value = 1000.75
+        counter_limiter = create_limiter(
+            SLIDING_WINDOW_COUNTER, sub_bucket_count=1)
+        prorate_limiter = create_limiter(SLIDING_WINDOW_PRORATE)
+        counter_limiter.try_acquire()
+        prorate_limiter.try_acquire()
+        _, counter_args = counter_limiter._redis_client.calls[0]
+        prorate_keys, prorate_args = prorate_limiter._redis_client.calls[0]
+        self.assertEqual(prorate_keys, ['test_1000', 'test_999'])
+        self.assertEqual(counter_args[0], 1000)
+        self.assertEqual(counter_args[2], prorate_args[0])
+        self.assertEqual(counter_args[2], 0.25)
+
+
+@skipUnless(is_redis_available(), 'redis server is not available')
+@mock.patch('ratelimiter.limiter.time')
+class SlidingWindowCounterRedisTest(SimpleTestCase):
+    '''Run the sliding window counter LUA script against the redis server
+    configured by REDIS_HOST.'''
+
+    def setUp(self):
+        self.keys = []
+
+    def tearDown(self):
+        for key in self.keys:
+            redis_client.delete(key)
+
+    def create_limiter(self, algorithm, rate, window, **kwargs):
+        key = 'test_%s' % uuid.uuid4().hex
+        self.keys.append(key)
+        return Limiter(algorithm, key, rate, window, **kwargs)
+
+    def test_hash_fields_bounded(self, mock_time):
+        sub_bucket_count = 3
+        limiter = self.create_limiter(
+            SLIDING_WINDOW_COUNTER, 1000, 1,
+            sub_bucket_count=sub_bucket_count)
+        for i in range(50):
+            mock_time.time.return_value = 1000 + i * 0.1
+            self.assertTrue(limiter.try_acquire())
+            self.assertLessEqual(redis_client.hlen(limiter._key),
+                                 sub_bucket_count + 1)
+
+    def test_one_sub_bucket_matches_prorate(self, mock_time):
+        counter_limiter = self.create_limiter(
+            SLIDING_WINDOW_COUNTER, 5, 1, sub_bucket_count=1)
+        prorate_limiter = self.create_limiter(SLIDING_WINDOW_PRORATE, 5, 1)
+        self.keys += ['%s_%d' % (prorate_limiter._key, window)
+                      for window in range(990, 1020)]
+        random.seed(0)
+        current_time = 1000
+        counter_results = []
+        prorate_results = []
+        for _ in range(200):
+            current_time += random.uniform(0, 0.2)
+            mock_time.time.return_value = current_time
+            counter_results.append(counter_limiter.try_acquire())
+            prorate_results.append(prorate_limiter.try_acquire())
+        self.assertEqual(counter_results, prorate_results)
+        self.assertIn(False, counter_results)
+
+    def test_large_bucket_index(self, mock_time):
+        # 100000 sub buckets per second give 15 digit indexes. The hash field
+        # must be the exact index instead of the number's string format.
+        limiter = self.create_limiter(
+            SLIDING_WINDOW_COUNTER, 10, 1, sub_bucket_count=100000)
+        mock_time.time.return_value = 1700000000.5
+        self.assertTrue(limiter.try_acquire())
+        self.assertEqual(redis_client.hkeys(limiter._key),
+                         [b'170000000050000'])
@@ -1,6 +1,7 @@
 from django.urls import path, re_path
 
 from . import views
+from constants import SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS
 
 urlpatterns = [
     path('dummy', views.index, name='dummy'),
@@ -12,4 +13,9 @@ urlpatterns = [
         r'sliding_window_prorate/.*',
         views.index,
         name='sliding_window_prorate'),
+    re_path(
+        r'sliding_window_counter_(?:%s)/.*' % '|'.join(
+            str(count) for count in SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS),
+        views.index,
+        name='sliding_window_counter'),
 ]
@@ -1,5 +1,7 @@
 import sys
-from constants import RATE_THRESHOLD
+from constants import (
+    RATE_THRESHOLD,
+    SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS)
 import time
 import http.client
 from decouple import config
@@ -252,7 +254,9 @@ def compare():
     it sends requests at RATE_THRESHOLD / 2 rate. To compare ratelimiters, it uses same
     sequence of flush gaps for all ratelimiter. Between each 2 ratelimiters' tests, it
     sleeps 10 seconds so that previous ratelimiter's redis cache could expire and won't
-    affect next ratelimiter.
+    affect next ratelimiter. Sliding window counter is tested with each of
+    SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS to show its accuracy against
+    # of sub buckets.
     '''
     assert(RATE_THRESHOLD <= MAX_RATE, 'rate exceeds limit')
     conn = http.client.HTTPConnection(
@@ -262,7 +266,9 @@ def compare():
         'leaky_token',
         'fixed_window',
         'sliding_window_log',
-        'sliding_window_prorate']
+        'sliding_window_prorate'] + [
+        'sliding_window_counter_%d' % sub_bucket_count
+        for sub_bucket_count in SLIDING_WINDOW_COUNTER_SUB_BUCKET_COUNTS]
     # Generate a random sequence of 100 flush gaps.
     flush_intervals = [
         random.uniform(
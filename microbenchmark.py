@@ -0,0 +1,368 @@
+import sys
+from ratelimiter.limiter import ALGORITHMS, Limiter, redis_client
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ratelimiter.settings')
+
+# Name of the benchmark path which goes through the Django middleware.
+DJANGO_MIDDLEWARE = 'django_middleware'
+
+# Ratelimiter url prefix the Django middleware path is benchmarked with.
+DJANGO_RATELIMITER = 'sliding_window_log'
+
+# Default # of tokens per 1 second window of each key. It is high enough
+# that decisions are accepted, so the accept path is measured. Run with a
+# low rate to measure the reject path.
+DEFAULT_RATE = 1000000000
+
+# Latency fields of a result: all, accepted and rejected decisions.
+LATENCY_FIELDS = ['latency_ms', 'accepted_latency_ms', 'rejected_latency_ms']
+
+# Concurrency modes.
+THREAD = 'thread'
+PROCESS = 'process'
+
+# Default duration of each benchmark run in seconds.
+DEFAULT_DURATION = 1
+
+# # of seconds between submitting workers and the start of measuring.
+WORKER_START_DELAY = 1
+
+# Default max # of threads or processes.
+DEFAULT_MAX_WORKERS = 8
+
+# Default max # of distinct keys.
+DEFAULT_MAX_KEYS = 1000000
+
+# Latency percentiles to report.
+PERCENTILES = [50, 90, 99, 99.9]
+
+USAGE = '''usage:
+python3 microbenchmark.py run [output json] [max workers] [max keys]
+    [duration] [rate]
+python3 microbenchmark.py compare [old json] [new json]'''
+
+
+def get_worker_counts(max_workers):
+    '''Get 1, 2, 4, ... up to max_workers.'''
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    return counts + [max_workers]
+
+
+def get_key_counts(max_keys):
+    '''Get 1, 100, 10000, ... up to max_keys.'''
+    counts = []
+    count = 1
+    while count < max_keys:
+        counts.append(count)
+        count *= 100
+    return counts + [max_keys]
+
+
+def get_decision_factory(path, key_count, key_prefix, rate):
+    '''Get a function which prepares the next ratelimiter decision.
+
+    The returned function is called outside the timed section of each
+    decision, so creating a Limiter for a random key isn't counted in the
+    decision's latency. Creating one per decision lets any # of distinct
+    keys be benchmarked without holding a Limiter per key in memory.
+
+    Parameters
+    ----------
+    path : str
+        a ratelimiter algorithm or DJANGO_MIDDLEWARE
+    key_count : int
+        # of distinct keys decisions are spread over
+    key_prefix : str
+        redis key prefix unique to the benchmark run
+    rate : int
+        # of tokens per 1 second window of each key
+
+    Returns
+    -------
+    function
+        a function which returns a function making one decision. The
+        decision function returns True if the decision accepts.
+    '''
+    if path == DJANGO_MIDDLEWARE:
+        import django
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        django.setup()
+        from ratelimiter import ratelimiter_middleware
+        # Replace the middleware's limiter so that the benchmark uses its
+        # own key and rate. The middleware looks it up on every request.
+        ratelimiter_middleware.sliding_window_log_limiter = Limiter(
+            DJANGO_RATELIMITER, key_prefix, rate, 1)
+        middleware = ratelimiter_middleware.RateLimiterMiddleware(
+            lambda request: HttpResponse())
+        request = RequestFactory().get(
+            '/ratelimiter_test/%s/index' % DJANGO_RATELIMITER)
+
+        def decide():
+            return middleware.process_request(request) is None
+        return lambda: decide
+
+    def create_decision():
+        key = "%s_%d" % (key_prefix, random.randrange(key_count))
+        return Limiter(path, key, rate, 1).try_acquire
+    return create_decision
+
+
+def run_worker(path, key_count, key_prefix, rate, start_time, end_time):
+    '''Make decisions from start_time until end_time and record each
+    decision's latency.
+
+    Returns
+    -------
+    tuple
+        (list of accepted decisions' latencies in seconds, list of
+        rejected decisions' latencies in seconds, time of the first
+        decision's start, time of the last decision's end). The times are
+        None if no decision was made.
+    '''
+    create_decision = get_decision_factory(path, key_count, key_prefix, rate)
+    accepted_latencies = []
+    rejected_latencies = []
+    first_time = None
+    last_time = None
+    # Wait for the other workers so that all workers measure in the same
+    # period.
+    time.sleep(max(0, start_time - time.time()))
+    while time.time() < end_time:
+        decide = create_decision()
+        if first_time is None:
+            first_time = time.time()
+        start = time.perf_counter()
+        accepted = decide()
+        latency = time.perf_counter() - start
+        if accepted:
+            accepted_latencies.append(latency)
+        else:
+            rejected_latencies.append(latency)
+        last_time = time.time()
+    return accepted_latencies, rejected_latencies, first_time, last_time
+
+
+def get_percentile(sorted_values, percentile):
+    '''Get the percentile of a sorted list with nearest rank.'''
+    index = int(len(sorted_values) * percentile / 100)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def get_latency_ms(latencies):
+    '''Get latency percentiles and max in milliseconds.
+
+    Returns
+    -------
+    dict
+        the latency stats, or None if there is no latency
+    '''
+    if not latencies:
+        return None
+    latencies = sorted(latencies)
+    latency_ms = {'p%s' % p: 1000 * get_percentile(latencies, p)
+                  for p in PERCENTILES}
+    latency_ms['max'] = 1000 * latencies[-1]
+    return latency_ms
+
+
+def run_benchmark(path, mode, worker_count, key_count, duration, rate):
+    '''Run one benchmark of a limiter path.
+
+    Parameters
+    ----------
+    path : str
+        a ratelimiter algorithm or DJANGO_MIDDLEWARE
+    mode : str
+        THREAD or PROCESS
+    worker_count : int
+        # of concurrent threads or processes
+    key_count : int
+        # of distinct keys decisions are spread over
+    duration : float
+        benchmark duration in seconds
+    rate : int
+        # of tokens per 1 second window of each key
+
+    Returns
+    -------
+    dict
+        the benchmark result
+    '''
+    key_prefix = "microbenchmark_%s_%s_%d_%d_%f" % (
+        path, mode, worker_count, key_count, time.time())
+    executor_class = (ThreadPoolExecutor if mode == THREAD
+                      else ProcessPoolExecutor)
+    with executor_class(max_workers=worker_count) as executor:
+        # Start workers later so that process and Django start up time
+        # isn't counted.
+        start_time = time.time() + WORKER_START_DELAY
+        end_time = start_time + duration
+        futures = [executor.submit(
+            run_worker, path, key_count, key_prefix, rate, start_time,
+            end_time)
+            for _ in range(worker_count)]
+        results = [future.result() for future in futures]
+    accepted_latencies = [latency for r in results for latency in r[0]]
+    rejected_latencies = [latency for r in results for latency in r[1]]
+    decisions = len(accepted_latencies) + len(rejected_latencies)
+    result = {
+        'path': path,
+        'mode': mode,
+        'workers': worker_count,
+        'keys': key_count,
+        'rate': rate,
+        'decisions': decisions,
+        'accepted': len(accepted_latencies),
+        'decisions_per_sec': 0,
+        'latency_ms': get_latency_ms(
+            accepted_latencies + rejected_latencies),
+        'accepted_latency_ms': get_latency_ms(accepted_latencies),
+        'rejected_latency_ms': get_latency_ms(rejected_latencies),
+    }
+    if decisions:
+        # Throughput only counts the period in which workers made
+        # decisions, not executor start up, shut down or result pickling.
+        first_time = min(r[2] for r in results if r[2] is not None)
+        last_time = max(r[3] for r in results if r[3] is not None)
+        result['decisions_per_sec'] = decisions / (last_time - first_time)
+    return result
+
+
+def get_git_commit():
+    '''Get current git commit hash or None if not in a git repository.'''
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(output_file, max_workers, max_keys, duration, rate):
+    '''Benchmark every limiter path and write results as JSON.
+
+    Every ratelimiter algorithm's Limiter.try_acquire() is benchmarked at
+    1..max_workers threads and processes over 1..max_keys distinct keys.
+    The Django middleware path is benchmarked with a RequestFactory request
+    through RateLimiterMiddleware.process_request at 1..max_workers threads
+    and processes. It only has a single key because the middleware has a
+    single limiter per url prefix. Set DEBUG=False so the middleware
+    doesn't print on every request.
+
+    Latency is reported for all decisions and separately for accepted and
+    rejected decisions because they run different redis commands.
+
+    Parameters
+    ----------
+    output_file : str
+        path of the JSON result file
+    max_workers : int
+        max # of concurrent threads or processes
+    max_keys : int
+        max # of distinct keys
+    duration : float
+        duration of each benchmark run in seconds
+    rate : int
+        # of tokens per 1 second window of each key
+    '''
+    runs = [(path, key_count) for path in ALGORITHMS
+            for key_count in get_key_counts(max_keys)]
+    runs.append((DJANGO_MIDDLEWARE, 1))
+    results = []
+    for path, key_count in runs:
+        for mode in [THREAD, PROCESS]:
+            for worker_count in get_worker_counts(max_workers):
+                result = run_benchmark(
+                    path, mode, worker_count, key_count, duration, rate)
+                results.append(result)
+                if result['latency_ms'] is None:
+                    print('path: %s; mode: %s; workers: %d; keys: %d; '
+                          'no decision was made' %
+                          (path, mode, worker_count, key_count))
+                    continue
+                print('path: %s; mode: %s; workers: %d; keys: %d; '
+                      'decisions/s: %.1f; accepted: %d/%d; p50: %.3fms; '
+                      'p99: %.3fms' %
+                      (path, mode, worker_count, key_count,
+                       result['decisions_per_sec'], result['accepted'],
+                       result['decisions'],
+                       result['latency_ms']['p50'],
+                       result['latency_ms']['p99']))
+    with open(output_file, 'w') as f:
+        json.dump({
+            'commit': get_git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'redis': redis_client.info()['redis_version'],
+            'duration': duration,
+            'rate': rate,
+            'results': results,
+        }, f, indent=2)
+
+
+def get_change(old, new):
+    '''Format the change from old to new value.'''
+    return '%.3f -> %.3f (%+.1f%%)' % (old, new, 100 * (new / old - 1))
+
+
+def compare(old_file, new_file):
+    '''Print decisions/s change and p99 latency change of all, accepted
+    and rejected decisions of each benchmark between 2 JSON result files,
+    e.g. from 2 commits.
+
+    Parameters
+    ----------
+    old_file : str
+        path of the baseline JSON result file
+    new_file : str
+        path of the new JSON result file
+    '''
+    def load(file_name):
+        with open(file_name) as f:
+            return {(r['path'], r['mode'], r['workers'], r['keys'],
+                     r['rate']): r
+                    for r in json.load(f)['results']}
+    old_results = load(old_file)
+    new_results = load(new_file)
+    for run, new in new_results.items():
+        old = old_results.get(run)
+        if (old is None or old['latency_ms'] is None
+                or new['latency_ms'] is None):
+            continue
+        changes = ['decisions/s: %s' % get_change(
+            old['decisions_per_sec'], new['decisions_per_sec'])]
+        for field in LATENCY_FIELDS:
+            if old[field] is not None and new[field] is not None:
+                changes.append('%s p99: %s' % (field, get_change(
+                    old[field]['p99'], new[field]['p99'])))
+        print('path: %s; mode: %s; workers: %d; keys: %d; rate: %d; %s' %
+              (run + ('; '.join(changes),)))
+
+
+if __name__ == '__main__':
+    if (len(sys.argv) >= 3 and sys.argv[1] == "run"):
+        benchmark(sys.argv[2],
+                  int(sys.argv[3]) if len(sys.argv) > 3
+                  else DEFAULT_MAX_WORKERS,
+                  int(sys.argv[4]) if len(sys.argv) > 4
+                  else DEFAULT_MAX_KEYS,
+                  float(sys.argv[5]) if len(sys.argv) > 5
+                  else DEFAULT_DURATION,
+                  int(sys.argv[6]) if len(sys.argv) > 6
+                  else DEFAULT_RATE)
+    elif (len(sys.argv) == 4 and sys.argv[1] == "compare"):
+        compare(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(USAGE)
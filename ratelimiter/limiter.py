@@ -0,0 +1,392 @@
+from decouple import config
+import asyncio
+import math
+import redis
+import time
+
+# Redis client is thread safe because each connection is obtained only
+# when executing command.
+redis_client = redis.Redis(
+    host=config('REDIS_HOST'),
+    port=config(
+        'REDIS_PORT',
+        cast=int))
+
+# Names of the supported ratelimiter algorithms.
+TOKEN_BUCKET = 'token'
+LEAKY_BUCKET = 'leaky_token'
+FIXED_WINDOW = 'fixed_window'
+SLIDING_WINDOW_LOG = 'sliding_window_log'
+SLIDING_WINDOW_PRORATE = 'sliding_window_prorate'
+SLIDING_WINDOW_COUNTER = 'sliding_window_counter'
+
+ALGORITHMS = [
+    TOKEN_BUCKET,
+    LEAKY_BUCKET,
+    FIXED_WINDOW,
+    SLIDING_WINDOW_LOG,
+    SLIDING_WINDOW_PRORATE,
+    SLIDING_WINDOW_COUNTER]
+
+# Default # of sub buckets per window for sliding window counter
+# ratelimiter.
+DEFAULT_SUB_BUCKET_COUNT = 10
+
+# LUA script for token bucket ratelimiter.
+# KEYS[1]: bucket key. ARGV[1]: tokens per bucket. ARGV[2]: bucket
+# length in milliseconds.
+TOKEN_BUCKET_LUA = '''
+  local key = KEYS[1];
+  local tokensPerBucket = tonumber(ARGV[1]);
+  local timeBucket = tonumber(ARGV[2]);
+  redis.call("SET", key, tokensPerBucket, "PX", timeBucket, "NX");
+  local decrResult = redis.call("DECR", key);
+  if (decrResult >= 0)
+  then
+    return 1;
+  else
+    local pttlResult = redis.call("PTTL", key);
+    if (pttlResult == -1)
+    then
+       redis.call("SET", key, (tokensPerBucket - 1), "PX", timeBucket);
+       return 1;
+    else
+       return 0;
+    end
+  end
+'''
+
+token_bucket_script = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+# LUA script for leaky bucket ratelimiter.
+# KEYS[1]: bucket key. ARGV[1]: tokens per bucket. ARGV[2]: bucket
+# length in milliseconds.
+LEAKY_BUCKET_LUA = '''
+  local key = KEYS[1];
+  local tokensPerBucket = tonumber(ARGV[1]);
+  local timeBucket = tonumber(ARGV[2]);
+  redis.call("SET", key, 0, "PX", timeBucket, "NX");
+  local incrResult = redis.call("INCR", key);
+  if (incrResult <= tokensPerBucket)
+  then
+    if (incrResult == 1)
+    then
+       local pttlResult = redis.call("PTTL", key);
+       if (pttlResult == -1)
+       then
+          redis.call("PEXPIRE", key, timeBucket);
+       end
+    end
+    return 1;
+  else
+    return 0;
+  end
+'''
+
+leaky_bucket_script = redis_client.register_script(LEAKY_BUCKET_LUA)
+
+# LUA script for sliding window log ratelimiter.
+# KEYS[1]: log key. KEYS[2]: request id counter key. ARGV[1]: current
+# time in seconds. ARGV[2]: window length in seconds. ARGV[3]: tokens
+# per window.
+SLIDING_WINDOW_LOG_LUA = '''
+  local key = KEYS[1];
+  local window = tonumber(ARGV[2]);
+  redis.call("ZREMRANGEBYSCORE", key, -1/0, ARGV[1] - window);
+  local windowSize = redis.call("ZCARD", key);
+  if (windowSize >= tonumber(ARGV[3]))
+  then
+    return 0;
+  end
+  local value = redis.call("INCR", KEYS[2]);
+  redis.call("ZADD", key, ARGV[1], value);
+  -- Let idle keys expire so that unused limiters don't leak memory.
+  local expireMs = math.ceil(window * 1000);
+  redis.call("PEXPIRE", key, expireMs);
+  redis.call("PEXPIRE", KEYS[2], expireMs);
+  return 1;
+'''
+
+sliding_window_log_script = redis_client.register_script(
+    SLIDING_WINDOW_LOG_LUA)
+
+# LUA script for sliding window prorate ratelimiter.
+# KEYS[1]: current window key. KEYS[2]: previous window key. ARGV[1]:
+# portion of previous window inside the sliding window. ARGV[2]: tokens
+# per window. ARGV[3]: window key expiration in seconds.
+SLIDING_WINDOW_PRORATE_LUA = '''
+  local currentKey = KEYS[1];
+  local previousKey = KEYS[2];
+  redis.call("SET", currentKey, 0, "NX", "EX", ARGV[3]);
+  local currentCnt = redis.call("GET", currentKey);
+  local previousCnt = redis.call("GET", previousKey);
+  if (previousCnt == false)
+  then
+    previousCnt = 0;
+  end
+
+  if (currentCnt + previousCnt * ARGV[1] < tonumber(ARGV[2]))
+  then
+    redis.call("INCR", currentKey);
+    return 1;
+  else
+    return 0;
+  end
+'''
+
+sliding_window_prorate_script = redis_client.register_script(
+    SLIDING_WINDOW_PRORATE_LUA)
+
+# LUA script for sliding window counter ratelimiter.
+# KEYS[1]: hash key whose fields are sub bucket indexes and values are
+# request counts. ARGV[1]: current sub bucket index. ARGV[2]: # of sub
+# buckets per window. ARGV[3]: portion of the oldest sub bucket inside
+# the sliding window. ARGV[4]: tokens per window. ARGV[5]: hash key
+# expiration in milliseconds.
+SLIDING_WINDOW_COUNTER_LUA = '''
+  local key = KEYS[1];
+  local currentBucket = tonumber(ARGV[1]);
+  local oldestBucket = currentBucket - tonumber(ARGV[2]);
+  local buckets = redis.call("HGETALL", key);
+  local count = 0;
+  for i = 1, #buckets, 2
+  do
+    local bucket = tonumber(buckets[i]);
+    if (bucket < oldestBucket)
+    then
+      redis.call("HDEL", key, buckets[i]);
+    elseif (bucket == oldestBucket)
+    then
+      count = count + buckets[i + 1] * ARGV[3];
+    else
+      count = count + buckets[i + 1];
+    end
+  end
+
+  if (count < tonumber(ARGV[4]))
+  then
+    -- Pass the index string as is. Lua formats numbers with more than
+    -- 14 significant digits in exponent notation, e.g. tostring() gives
+    -- 1.7000000005e+14, so the number must not be the field name.
+    redis.call("HINCRBY", key, ARGV[1], 1);
+    redis.call("PEXPIRE", key, ARGV[5]);
+    return 1;
+  else
+    return 0;
+  end
+'''
+
+sliding_window_counter_script = redis_client.register_script(
+    SLIDING_WINDOW_COUNTER_LUA)
+
+
+class Limiter(object):
+    '''A redis backed ratelimiter which doesn't depend on any web framework.
+
+    It allows at most `rate` acquisitions per `window` seconds for a key
+    across all threads, processes and machines sharing the same redis.
+
+    Attributes
+    ----------
+    _algorithm : str
+        name of the ratelimiter algorithm, one of ALGORITHMS
+    _key : str
+        redis key prefix of this limiter
+    _rate : int
+        # of tokens per window
+    _window : float
+        window length in seconds
+    _redis_client : redis.Redis
+        redis client to execute commands with
+    _sub_bucket_count : int
+        # of sub buckets per window for sliding window counter
+    '''
+
+    def __init__(self, algorithm, key, rate, window, client=None,
+                 sub_bucket_count=DEFAULT_SUB_BUCKET_COUNT):
+        '''
+        Parameters
+        ----------
+        algorithm : str
+            name of the ratelimiter algorithm, one of ALGORITHMS
+        key : str
+            redis key prefix of this limiter
+        rate : int
+            # of tokens per window
+        window : float
+            window length in seconds
+        client : redis.Redis
+            redis client to use. Defaults to the module's redis_client.
+        sub_bucket_count : int
+            # of sub buckets per window for sliding window counter.
+            More sub buckets are more accurate but use more memory.
+        '''
+        if algorithm not in ALGORITHMS:
+            raise ValueError('unknown ratelimiter algorithm: %s' % algorithm)
+        if rate <= 0 or window <= 0:
+            raise ValueError('rate and window must be positive')
+        if sub_bucket_count < 1:
+            raise ValueError('sub_bucket_count must be positive')
+        self._algorithm = algorithm
+        self._key = key
+        self._rate = rate
+        self._window = window
+        self._redis_client = client or redis_client
+        self._sub_bucket_count = sub_bucket_count
+        self._window_ms = max(1, int(math.ceil(window * 1000)))
+        super().__init__()
+
+    def try_acquire(self):
+        '''Try to acquire a token without waiting.
+
+        Returns
+        -------
+        bool
+            True if a token is acquired, False if rate limited
+        '''
+        if self._algorithm == TOKEN_BUCKET:
+            return self.__token_acquire()
+        elif self._algorithm == LEAKY_BUCKET:
+            return self.__leaky_token_acquire()
+        elif self._algorithm == FIXED_WINDOW:
+            return self.__fixed_window_acquire()
+        elif self._algorithm == SLIDING_WINDOW_LOG:
+            return self.__sliding_window_log_acquire()
+        elif self._algorithm == SLIDING_WINDOW_PRORATE:
+            return self.__sliding_window_prorate_acquire()
+        else:
+            return self.__sliding_window_counter_acquire()
+
+    def acquire(self, timeout=None):
+        '''Block until a token is acquired or timeout elapses.
+
+        Parameters
+        ----------
+        timeout : float
+            max # of seconds to wait. None means waiting forever.
+
+        Returns
+        -------
+        bool
+            True if a token is acquired, False if timed out
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self.try_acquire():
+                return True
+            delay = self.__retry_delay(deadline)
+            if delay is None:
+                return False
+            time.sleep(delay)
+
+    async def acquire_async(self, timeout=None, executor=None):
+        '''Asyncio version of acquire(). redis-py has no asyncio client, so
+        each try runs the blocking try_acquire() in an executor thread to
+        keep redis round trips off the event loop.
+
+        There are 2 limits of running in an executor:
+        1. If the awaiting task is cancelled, e.g. by asyncio.wait_for(), a
+           try already running in the executor still finishes and may take
+           a token which nobody uses. Prefer the timeout argument over
+           cancelling to bound the wait.
+        2. By default all callers share the event loop's default executor,
+           which has min(32, cpu + 4) threads. Pass a dedicated executor
+           to make more concurrent tries or to isolate limiters.
+
+        Parameters
+        ----------
+        timeout : float
+            max # of seconds to wait. None means waiting forever.
+        executor : concurrent.futures.Executor
+            executor to run tries in. None means the loop's default
+            executor.
+
+        Returns
+        -------
+        bool
+            True if a token is acquired, False if timed out
+        '''
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if await loop.run_in_executor(executor, self.try_acquire):
+                return True
+            delay = self.__retry_delay(deadline)
+            if delay is None:
+                return False
+            await asyncio.sleep(delay)
+
+    def __retry_delay(self, deadline):
+        '''Get # of seconds to wait before next try. Waiting the average
+        gap between 2 tokens avoids hammering redis while rate limited.
+
+        Parameters
+        ----------
+        deadline : float
+            time.monotonic() deadline, or None if waiting forever
+
+        Returns
+        -------
+        float
+            seconds to wait, or None if deadline has been reached
+        '''
+        delay = self._window / self._rate
+        if deadline is None:
+            return delay
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return min(delay, remaining)
+
+    def __token_acquire(self):
+        lua_result = token_bucket_script(
+            keys=[self._key], args=[self._rate, self._window_ms],
+            client=self._redis_client)
+        return lua_result == 1
+
+    def __leaky_token_acquire(self):
+        lua_result = leaky_bucket_script(
+            keys=[self._key], args=[self._rate, self._window_ms],
+            client=self._redis_client)
+        return lua_result == 1
+
+    def __fixed_window_acquire(self):
+        key = "%d_%s" % (self.__get_fixed_window(time.time()), self._key)
+        pipe = self._redis_client.pipeline()
+        res = pipe.set(key, self._rate, ex=max(
+            1, int(2 * self._window)), nx=True).decr(key).execute()
+        return res[1] >= 0
+
+    def __sliding_window_log_acquire(self):
+        lua_result = sliding_window_log_script(
+            keys=[self._key, self._key + "_counter"],
+            args=[time.time(), self._window, self._rate],
+            client=self._redis_client)
+        return lua_result == 1
+
+    def __sliding_window_prorate_acquire(self):
+        current_time = time.time()
+        current_window = self.__get_fixed_window(current_time)
+        previous_window_portion = current_window + \
+            1 - current_time / self._window
+        lua_result = sliding_window_prorate_script(
+            keys=["%s_%d" % (self._key, current_window),
+                  "%s_%d" % (self._key, current_window - 1)],
+            args=[previous_window_portion, self._rate,
+                  max(1, int(4 * self._window))],
+            client=self._redis_client)
+        return lua_result == 1
+
+    def __sliding_window_counter_acquire(self):
+        sub_bucket_time = time.time() * self._sub_bucket_count / self._window
+        current_bucket = int(math.floor(sub_bucket_time))
+        oldest_bucket_portion = current_bucket + 1 - sub_bucket_time
+        lua_result = sliding_window_counter_script(
+            keys=[self._key],
+            args=[current_bucket, self._sub_bucket_count,
+                  oldest_bucket_portion, self._rate, 2 * self._window_ms],
+            client=self._redis_client)
+        return lua_result == 1
+
+    def __get_fixed_window(self, time_sec):
+        return int(math.floor(time_sec / self._window))